@@ -8,9 +8,11 @@ from src.evaluation import (
     evaluate_retrieval_quality,
     log_scrape_result,
     track_timing,
+    summarize_counters,
 )
+from src.vectorstore import HybridRetriever
+from src import metrics
 from PIL import Image
-import time
 
 # ---------- Setup ----------
 st.set_page_config(page_title="LeadGen RAG Scraper", layout="wide")
@@ -19,6 +21,9 @@ st.set_page_config(page_title="LeadGen RAG Scraper", layout="wide")
 with open("style.css") as css:
     st.markdown(f"<style>{css.read()}</style>", unsafe_allow_html=True)
 
+# ✅ Expose Prometheus metrics (no-op if already running)
+metrics.start_http_server()
+
 # ✅ Ensure domain_tables is always initialized
 if "domain_tables" not in st.session_state:
     st.session_state.domain_tables = {}
@@ -50,26 +55,36 @@ if nav_option == "Evaluation":
 
     if st.button("Run Evaluation"):
         with st.spinner("Evaluating..."):
-            total_start = time.time()
-            scrape_start = time.time()
-
-            output = generate_insight(domain, task)
-            scrape_end = time.time()
+            with metrics.trace() as run:
+                output = generate_insight(domain, task)
 
             retriever = HybridRetriever(text=output, domain=domain)
             chunks = retriever.search(task, top_k=5)
 
-            llm_time = 0.8  # Estimate
-            total_end = time.time()
-
-            timing_result = track_timing(scrape_end - scrape_start, 0.0, llm_time)
+            fallback_time = run.total("scrape.selenium_fallback")
+            timing_result = track_timing(
+                run.total("scrape") - fallback_time,
+                fallback_time,
+                run.total("llm.query"),
+                retrieval_sec=run.total("retriever.load") + run.total("retriever.build") + run.total("retriever.search"),
+                total_sec=run.total("insight"),
+            )
             insight_scores = evaluate_insight_quality(output, task, chunks)
             retrieval_scores = evaluate_retrieval_quality(chunks, task)
-            robustness = log_scrape_result("Static (HTML only)", True, False, "Simple HTML")
+            used_fallback = run.counters["scrape.fallbacks"] > 0
+            robustness = log_scrape_result(
+                "JS-rendered (Selenium)" if used_fallback else "Static (HTML only)",
+                run.counters["scrape.errors"] + run.counters["scrape.fallback_errors"] == 0,
+                used_fallback,
+                "Selenium fallback triggered" if used_fallback else "Simple HTML",
+            )
 
             st.subheader("⚡ Runtime")
             st.table(pd.DataFrame(timing_result.items(), columns=["Metric", "Time"]))
 
+            st.subheader("📈 Pipeline Counters")
+            st.table(pd.DataFrame(summarize_counters(run.counters).items(), columns=["Metric", "Value"]))
+
             st.subheader("🧠 Insight Quality")
             st.table(pd.DataFrame(insight_scores.items(), columns=["Metric", "Score"]))
 
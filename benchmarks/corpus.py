@@ -0,0 +1,64 @@
+# corpus.py
+
+import os
+import random
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+VOCAB = (
+    "company services mission customers platform data analytics cloud team product "
+    "pricing support growth revenue market solution partner enterprise software retail "
+    "logistics health finance marketing consulting engineering design security privacy "
+    "automation forecast dashboard pipeline warehouse integration mobile payment store "
+    "delivery quality reliable secure fast global local industry leading trusted award"
+).split()
+
+QUERIES = [
+    "What are their services?",
+    "What is the mission of this organization?",
+    "Who are their customers?",
+    "How can I contact the company?",
+    "What industries do they work with?",
+    "What products do they sell?",
+    "Do they offer pricing for enterprise?",
+    "Where is the company located?",
+]
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def make_sentence(rng: random.Random) -> str:
+    words = [rng.choice(VOCAB) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def make_corpus(n_chunks: int, chunk_size: int = 3, seed: int = 13) -> str:
+    """
+    Deterministic text that HybridRetriever.chunk_text splits into
+    exactly `n_chunks` chunks of `chunk_size` sentences.
+    """
+    rng = random.Random(seed)
+    return " ".join(make_sentence(rng) for _ in range(n_chunks * chunk_size))
+
+
+def make_huge_page(n_sections: int = 1500, seed: int = 7) -> str:
+    """
+    Deterministic multi-megabyte page with many headed sections and links.
+    Generated rather than stored so the repository stays small.
+    """
+    rng = random.Random(seed)
+    parts = [
+        "<!DOCTYPE html><html><head><title>Huge Catalogue</title>",
+        '<meta name="description" content="A very large catalogue page used for benchmarks.">',
+        "</head><body>",
+    ]
+    for i in range(n_sections):
+        parts.append(f"<h2>Section {i} {rng.choice(VOCAB)} {rng.choice(VOCAB)}</h2>")
+        for _ in range(3):
+            parts.append(f"<p>{make_sentence(rng)} {make_sentence(rng)}</p>")
+        parts.append(f'<div><a href="/item/{i}">View item {i}</a><button>Buy {i}</button></div>')
+    parts.append("<footer><p>Privacy Policy</p><p>All rights reserved.</p></footer></body></html>")
+    return "\n".join(parts)
@@ -0,0 +1,126 @@
+# embedding_load.py
+"""
+Load test: shared embedding server vs. per-worker in-process encoding.
+
+    python -m benchmarks.embedding_load --workers 1 4 16 --requests 50
+
+Each worker thread encodes one query at a time, the way
+`HybridRetriever.search` does. "local" calls the in-process model directly;
+"service" goes through a server started as a separate process, which
+micro-batches concurrent requests.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import config
+from benchmarks.corpus import QUERIES
+from src.embedding_service import EmbeddingClient
+from src.vectorstore import load_local_model
+
+
+def run_load(encode_factory, workers: int, requests: int) -> dict:
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(workers + 1)
+
+    def worker(worker_id):
+        encode = encode_factory()
+        own = []
+        barrier.wait()
+        for i in range(requests):
+            query = f"{QUERIES[(worker_id + i) % len(QUERIES)]} #{worker_id}-{i}"
+            start = time.perf_counter()
+            encode([query])
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(workers)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "workers": workers,
+        "requests": workers * requests,
+        "throughput_per_sec": workers * requests / elapsed,
+        "median_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+def start_server(socket_path: str, max_batch: int, max_wait_ms: float, timeout: float = 300.0):
+    proc = subprocess.Popen([
+        sys.executable, "-m", "src.embedding_service",
+        "--socket", socket_path,
+        "--max-batch", str(max_batch),
+        "--max-wait-ms", str(max_wait_ms),
+    ])
+    # No circuit breaker backoff while polling for the server to come up
+    client = EmbeddingClient(socket_path, retry_after=0)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("Embedding server exited during startup")
+        try:
+            client.encode(["warmup"])
+            return proc
+        except ConnectionError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("Embedding server did not start in time")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Embedding server load test")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=50, help="encodes per worker")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    print(f"Model: {config.EMBEDDING_MODEL_NAME}")
+    model = load_local_model()
+    model.encode(["warmup"])
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="leadgen-embed-"), "embed.sock")
+    proc = start_server(socket_path, args.max_batch, args.max_wait_ms)
+    client = EmbeddingClient(socket_path)
+
+    results = []
+    try:
+        for workers in args.workers:
+            for mode, factory in (("local", lambda: model.encode), ("service", lambda: client.encode)):
+                result = run_load(factory, workers, args.requests)
+                result["mode"] = mode
+                results.append(result)
+                print(f"{mode:<8} workers={workers:<3} {result['throughput_per_sec']:8.1f} enc/s   "
+                      f"median {result['median_ms']:7.2f} ms   p95 {result['p95_ms']:7.2f} ms")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"max_batch": args.max_batch, "max_wait_ms": args.max_wait_ms, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
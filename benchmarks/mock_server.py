@@ -0,0 +1,83 @@
+# mock_server.py
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.corpus import load_fixture, make_huge_page
+
+
+class MockState:
+    def __init__(self, llm_latency: float = 0.0):
+        self.llm_latency = llm_latency
+        self.pages = {
+            "/static/": load_fixture("static.html"),
+            "/js/": load_fixture("js_shell.html"),
+            "/huge/": make_huge_page(),
+        }
+        self.llm_calls = 0
+
+
+def _make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            page = state.pages.get(self.path)
+            if page is None:
+                self._send(404, b"not found", "text/plain")
+                return
+            self._send(200, page.encode("utf-8"), "text/html; charset=utf-8")
+
+        def do_POST(self):
+            # Mimics the Hugging Face inference API response shape
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            state.llm_calls += 1
+            if state.llm_latency:
+                time.sleep(state.llm_latency)
+            prompt = payload.get("inputs", "")
+            answer = f"Mock answer based on {len(prompt)} prompt characters."
+            self._send(200, json.dumps([{"generated_text": answer}]).encode("utf-8"), "application/json")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class MockServer:
+    """
+    Local HTTP server serving the HTML fixtures and a mock LLM endpoint.
+
+    Pages: /static/, /js/ (needs the Selenium fallback), /huge/.
+    LLM:   POST /llm with a configurable artificial latency.
+    """
+    def __init__(self, llm_latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.state = MockState(llm_latency)
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self.state))
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, page: str) -> str:
+        return f"{self.base_url}/{page}/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
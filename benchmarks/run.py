@@ -0,0 +1,276 @@
+# run.py
+"""
+Offline benchmark suite for the scrape → retrieve → LLM path.
+
+    python -m benchmarks.run                      # run and compare with baseline
+    python -m benchmarks.run --save-baseline      # record a new baseline
+    python -m benchmarks.run --sizes 50 200 --repeats 3 --llm-latency 0.2
+
+Everything runs against a local mock HTTP server and a mock LLM endpoint.
+The embedding model must already be in the local Hugging Face cache.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Never reach out to the Hugging Face Hub while benchmarking
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import config
+
+from bs4 import BeautifulSoup
+
+from benchmarks.corpus import QUERIES, load_fixture, make_corpus, make_huge_page
+from benchmarks.mock_server import MockServer
+from src import llm, metrics, scraper, vectorstore
+from src.index_store import measure_recall
+from src.rag_runner import generate_insight
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+class FakeChromeDriver:
+    """
+    Stand-in for webdriver.Chrome: "renders" the JS fixture from disk.
+    """
+    render_latency = 0.0
+
+    def __init__(self, options=None):
+        self.html = ""
+
+    def get(self, url):
+        if self.render_latency:
+            time.sleep(self.render_latency)
+        self.html = load_fixture("js_rendered.html")
+
+    def execute_script(self, script):
+        return self.html
+
+    def quit(self):
+        pass
+
+
+def measure(fn, repeats: int, items: int = 1, setup=None) -> dict:
+    timings = []
+    # The pipeline prints previews at every step; keep them out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeats):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "median_sec": median,
+        "p95_sec": timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))],
+        "min_sec": timings[0],
+        "items": items,
+        "throughput_per_sec": items / median if median > 0 else None,
+    }
+
+
+def parse_page(html: str):
+    soup = BeautifulSoup(html, "html.parser")
+    body_text = soup.get_text(separator=" ", strip=True)
+    cleaned_text, _ = scraper.remove_boilerplate(body_text)
+    scraper.extract_metadata_from_tags(soup)
+    scraper.extract_contacts(cleaned_text)
+
+
+def clear_scrape_cache():
+    if os.path.exists(".scrape_cache.txt"):
+        os.remove(".scrape_cache.txt")
+
+
+def clear_index_cache():
+    shutil.rmtree(vectorstore.CACHE_DIR, ignore_errors=True)
+    os.makedirs(vectorstore.CACHE_DIR, exist_ok=True)
+
+
+def run_suite(sizes, repeats: int, llm_latency: float) -> tuple:
+    results = {}
+    recall = {}
+
+    def record(name, result):
+        results[name] = result
+        print(f"{name:<32} median {result['median_sec'] * 1000:10.2f} ms   "
+              f"p95 {result['p95_sec'] * 1000:10.2f} ms")
+
+    with MockServer(llm_latency=llm_latency) as server:
+        llm.API_URL = f"{server.base_url}/llm"
+
+        # --- Scrape (network + parse + fallback) ---
+        for page in ("static", "js", "huge"):
+            name = "scrape/js_fallback" if page == "js" else f"scrape/{page}"
+            url = server.url(page)
+            record(name, measure(lambda: scraper.scrape_site(url), repeats, setup=clear_scrape_cache))
+
+        # --- Parse only ---
+        for page, html in (("static", load_fixture("static.html")), ("huge", make_huge_page())):
+            record(f"parse/{page}", measure(lambda: parse_page(html), repeats))
+
+        chunker = vectorstore.HybridRetriever.__new__(vectorstore.HybridRetriever)
+        chunker.chunk_size = 3
+
+        for n in sizes:
+            text = make_corpus(n)
+            chunks = chunker.chunk_text(text)
+
+            record(f"chunk/{n}", measure(lambda: chunker.chunk_text(text), repeats, items=n))
+            model = vectorstore.get_embedding_model()
+            record(f"embed/{n}", measure(lambda: model.encode(chunks), repeats, items=n))
+
+            embeddings = model.encode(chunks)
+            recall[str(n)] = measure_recall(embeddings, config.INDEX_QUANTIZATION)
+            print(f"{'recall@7/' + str(n):<32} {recall[str(n)]:.4f} ({config.INDEX_QUANTIZATION})")
+
+            domain = f"https://bench-{n}.example/"
+            record(f"index_build/{n}", measure(
+                lambda: vectorstore.HybridRetriever(text=text, domain=domain),
+                repeats, items=n, setup=clear_index_cache,
+            ))
+            record(f"index_load/{n}", measure(
+                lambda: vectorstore.HybridRetriever(text=text, domain=domain), repeats, items=n,
+            ))
+
+            retriever = vectorstore.HybridRetriever(text=text, domain=domain)
+            # Cold: no cache at all, including the semantic tier
+            semantic_threshold = vectorstore.query_cache.semantic_threshold
+            vectorstore.query_cache.semantic_threshold = None
+            try:
+                record(f"search/{n}", measure(
+                    lambda: [retriever.search(q, top_k=7) for q in QUERIES],
+                    repeats, items=len(QUERIES), setup=vectorstore.query_cache.clear,
+                ))
+            finally:
+                vectorstore.query_cache.semantic_threshold = semantic_threshold
+            record(f"search_cached/{n}", measure(
+                lambda: [retriever.search(q, top_k=7) for q in QUERIES],
+                repeats, items=len(QUERIES),
+            ))
+
+        # --- End to end: fresh domain, mock LLM ---
+        def fresh_domain():
+            clear_scrape_cache()
+            clear_index_cache()
+
+        url = server.url("static")
+        record("e2e/static", measure(
+            lambda: generate_insight(url, QUERIES[0], wait_sec=0), repeats, setup=fresh_domain,
+        ))
+
+    return results, recall
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        ratio = cur["median_sec"] / base["median_sec"] if base["median_sec"] > 0 else 1.0
+        flag = "REGRESSION" if ratio > 1.0 + threshold else ""
+        print(f"{name:<32} {base['median_sec'] * 1000:10.2f} ms -> {cur['median_sec'] * 1000:10.2f} ms  "
+              f"({ratio:5.2f}x) {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline RAG pipeline benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 800],
+                        help="corpus sizes in chunks")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.05,
+                        help="artificial mock LLM latency in seconds")
+    parser.add_argument("--render-latency", type=float, default=0.0,
+                        help="artificial Selenium render latency in seconds")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="allowed slowdown vs. baseline (0.20 = 20%%)")
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    baseline_path = os.path.abspath(args.baseline)
+    output_path = os.path.abspath(args.output) if args.output else os.path.join(
+        DEFAULT_RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+
+    FakeChromeDriver.render_latency = args.render_latency
+    scraper.webdriver.Chrome = FakeChromeDriver
+    # The scraper waits 5s for JS to settle; the fake driver renders instantly
+    scraper.time = SimpleNamespace(sleep=lambda sec: None)
+
+    workdir = tempfile.mkdtemp(prefix="leadgen-bench-")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    vectorstore.CACHE_DIR = os.path.join(workdir, "cache")
+    try:
+        results, recall = run_suite(args.sizes, args.repeats, args.llm_latency)
+    finally:
+        # Span logging stays on (into the temp dir) so its cost is measured
+        metrics.flush_log()
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+            "repeats": args.repeats,
+            "llm_latency": args.llm_latency,
+            "render_latency": args.render_latency,
+        },
+        "results": results,
+        "recall": recall,
+    }
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Results saved to {output_path}")
+
+    low_recall = [n for n, r in recall.items() if r < config.INDEX_MIN_RECALL]
+    if low_recall:
+        print(f"❌ {config.INDEX_QUANTIZATION} recall@7 below {config.INDEX_MIN_RECALL} for sizes: {', '.join(low_recall)}")
+        return 1
+
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print("⚠️ No baseline found; run with --save-baseline to record one.")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n📊 Comparison with baseline (threshold {args.threshold:.0%}):\n")
+    regressions = compare(report, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,2 +1,24 @@
+import os
+
 # Hugging Face API Key and Model
 HF_MODEL_NAME = "google/flan-t5-large"  # or any other available model
+
+# Sentence embedding model used for retrieval
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# Unix socket of a shared embedding server (python -m src.embedding_service).
+# When unset, each process loads its own copy of the model.
+EMBEDDING_SOCKET = os.getenv("LEADGEN_EMBEDDING_SOCKET")
+
+# Metrics export (set to None / 0 to disable)
+METRICS_LOG_PATH = "logs/metrics.jsonl"
+METRICS_PORT = 9108
+
+# Per-domain retrieval bundles: "float16" or "int8" embeddings.
+# int8 falls back to float16 when top-k recall vs. float32 drops below the minimum.
+INDEX_QUANTIZATION = "int8"
+INDEX_MIN_RECALL = 0.95
+
+# Retrieval result cache (per process). Near-duplicate queries whose embeddings
+# have cosine similarity >= the threshold reuse cached results; None disables that tier.
+QUERY_CACHE_SIZE = 1024
+QUERY_CACHE_SEMANTIC_THRESHOLD = 0.92
@@ -0,0 +1,271 @@
+# embedding_service.py
+"""
+Local embedding server shared by every worker on a machine.
+
+One process holds the SentenceTransformer model and listens on a Unix
+socket. Concurrent encode requests are collected into micro-batches
+(up to `max_batch` texts or `max_wait_ms` after the first request) and
+encoded together, then each caller gets its own rows back.
+
+    python -m src.embedding_service --socket /tmp/leadgen-embed.sock
+
+Wire format, both directions: u32 length + JSON header, followed for
+responses by the raw float32 vectors described in the header.
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import config
+from src.metrics import span, inc
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+def _recv_exact(sock, n: int) -> bytearray:
+    # A bytearray keeps arrays built on it with np.frombuffer writable
+    buf = bytearray()
+    while len(buf) < n:
+        part = sock.recv(n - len(buf))
+        if not part:
+            raise ConnectionError("Embedding socket closed")
+        buf.extend(part)
+    return buf
+
+
+def _send_message(sock, header: dict, payload: bytes = b""):
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(struct.pack("<I", len(data)) + data + payload)
+
+
+def _recv_header(sock) -> dict:
+    (length,) = struct.unpack("<I", _recv_exact(sock, 4))
+    return json.loads(_recv_exact(sock, length))
+
+
+class MicroBatcher:
+    """
+    Collects encode requests from many threads and runs them as batches
+    on a single worker thread.
+    """
+    def __init__(self, encode, max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 dim: int = None):
+        self.encode_fn = encode
+        self.dim = dim
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, texts: list[str]) -> Future:
+        future = Future()
+        self.requests.put((texts, future))
+        return future
+
+    def _collect(self) -> list:
+        batch = [self.requests.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [t for texts, _ in batch for t in texts]
+            try:
+                with span("embed.server_batch", requests=len(batch), texts=len(texts)):
+                    vectors = self._encode(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            inc("embed.server_batches")
+            inc("embed.server_texts", len(texts))
+            start = 0
+            for texts_i, future in batch:
+                future.set_result(vectors[start:start + len(texts_i)])
+                start += len(texts_i)
+
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            # Empty requests still answer with (0, dim), like model.encode
+            if self.dim is None:
+                self.dim = np.asarray(self.encode_fn([""]), dtype=np.float32).shape[1]
+            return np.empty((0, self.dim), dtype=np.float32)
+        vectors = np.asarray(self.encode_fn(texts), dtype=np.float32)
+        self.dim = vectors.shape[1]
+        return vectors
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # One connection carries many requests from the same client
+        while True:
+            try:
+                request = _recv_header(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                vectors = self.server.batcher.submit(request.get("texts", [])).result()
+            except Exception as e:
+                header, payload = {"error": f"{type(e).__name__}: {e}"}, b""
+            else:
+                header = {"shape": list(vectors.shape), "dtype": "<f4"}
+                payload = vectors.astype("<f4", copy=False).tobytes()
+            try:
+                _send_message(self.request, header, payload)
+            except OSError:
+                # Client gave up (e.g. timed out) and closed the connection
+                return
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Many workers may connect at once; the socketserver default is 5
+    request_queue_size = 256
+
+    def __init__(self, socket_path: str, encode, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, dim: int = None):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.batcher = MicroBatcher(encode, max_batch, max_wait_ms, dim)
+        super().__init__(socket_path, _Handler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+class EmbeddingClient:
+    """
+    Drop-in for `SentenceTransformer.encode` backed by the embedding server.
+    Each thread keeps its own connection. If the server cannot be reached
+    or does not answer within `timeout`, and a `fallback` loader is given,
+    encoding falls back to that model and keeps using it for `retry_after`
+    seconds before trying the server again. A request is never resent,
+    except once on a fresh connection when the kept one turns out stale.
+    """
+    def __init__(self, socket_path: str, fallback=None, timeout: float = 60.0, retry_after: float = 30.0):
+        self.socket_path = socket_path
+        self.fallback = fallback
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._local = threading.local()
+        self._down_until = 0.0
+        self._warned = False
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def _request(self, texts: list[str]) -> np.ndarray:
+        sock = self._connection()
+        _send_message(sock, {"texts": texts})
+        header = _recv_header(sock)
+        if "error" in header:
+            raise RuntimeError(f"Embedding server error: {header['error']}")
+        shape = header["shape"]
+        payload = _recv_exact(sock, int(np.prod(shape)) * 4)
+        return np.frombuffer(payload, dtype=header["dtype"]).reshape(shape)
+
+    def _try_request(self, texts: list[str]):
+        reused = getattr(self._local, "sock", None) is not None
+        try:
+            return self._request(texts)
+        except socket.timeout:
+            # Alive but overloaded: resending would only encode the same texts again
+            self._reset()
+            return None
+        except (ConnectionError, OSError):
+            self._reset()
+            if not reused:
+                return None
+        # The kept connection was stale (e.g. the server restarted): reconnect once
+        try:
+            return self._request(texts)
+        except (ConnectionError, OSError):
+            self._reset()
+            return None
+
+    def encode(self, texts) -> np.ndarray:
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        if time.monotonic() >= self._down_until:
+            vectors = self._try_request(texts)
+            if vectors is not None:
+                self._warned = False
+                return vectors
+            # Circuit open: skip the server until the backoff interval passes
+            self._down_until = time.monotonic() + self.retry_after
+        inc("embed.client_fallbacks")
+        if self.fallback is None:
+            raise ConnectionError(f"Embedding server unavailable at {self.socket_path}")
+        if not self._warned:
+            self._warned = True
+            print(f"⚠️ Embedding server unavailable at {self.socket_path}, "
+                  f"encoding locally (retrying every {self.retry_after:.0f}s)")
+        return self.fallback().encode(texts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared embedding server")
+    parser.add_argument("--socket", default=config.EMBEDDING_SOCKET or "/tmp/leadgen-embed.sock")
+    parser.add_argument("--model", default=config.EMBEDDING_MODEL_NAME)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(args.model)
+    server = EmbeddingServer(args.socket, model.encode, args.max_batch, args.max_wait_ms,
+                             dim=model.get_sentence_embedding_dimension())
+    print(f"🧩 Embedding server ({args.model}) listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
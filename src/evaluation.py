@@ -1,21 +1,96 @@
-def evaluate_insight_quality(output: str, task: str, chunks: list[str]) -> dict:
+from collections import Counter
+
+import numpy as np
+
+# Building a _ChunkIndex costs several plain scans, so only index chunk sets
+# that are scored against at least this many outputs.
+_INDEX_MIN_ROWS = 8
+
+
+class _ChunkScan:
     """
-    Automatically estimate insight quality with heuristics.
-    
-    - Relevance: Check if task keywords appear in output.
-    - Specificity: Look for named entities or URLs from chunks.
-    - Faithfulness: Check if output phrases overlap with chunks.
+    Plain substring checks against the joined chunk text (the original
+    heuristic). Cheapest when a chunk set is scored only a few times.
+    """
+    def __init__(self, chunks: list[str]):
+        self.text = " ".join(chunks).lower()
+
+    def contains_word(self, word: str) -> bool:
+        return word in self.text
+
+    def contains_phrase(self, phrase: str) -> bool:
+        return phrase in self.text
+
+
+class _ChunkIndex:
+    """
+    Tokenized view of a set of chunks for fast substring checks.
+
+    Output words never contain whitespace, so `word in chunk_text` holds
+    exactly when the word is a substring of a single chunk token. Tokens are
+    indexed by character trigrams, so a lookup only verifies a few candidates
+    instead of scanning the whole joined text.
     """
+    def __init__(self, chunks: list[str]):
+        self.text = " ".join(chunks).lower()
+        self.tokens = set(self.text.split())
+        self.short = set()
+        self.trigrams = {}
+        for token in self.tokens:
+            for n in (1, 2):
+                self.short.update(token[i:i + n] for i in range(len(token) - n + 1))
+            for i in range(len(token) - 2):
+                self.trigrams.setdefault(token[i:i + 3], set()).add(token)
+        self._memo = {}
+
+    def contains_word(self, word: str) -> bool:
+        if word in self._memo:
+            return self._memo[word]
+        if word in self.tokens:
+            found = True
+        elif len(word) < 3:
+            found = word in self.short
+        else:
+            postings = []
+            for i in range(len(word) - 2):
+                posting = self.trigrams.get(word[i:i + 3])
+                if posting is None:
+                    postings = None
+                    break
+                postings.append(posting)
+            if postings is None:
+                found = False
+            else:
+                candidates = min(postings, key=len)
+                found = any(word in token for token in candidates)
+        self._memo[word] = found
+        return found
+
+    def contains_phrase(self, phrase: str) -> bool:
+        words = phrase.split()
+        if not words:
+            return True  # matches `"" in chunk_text`
+        if len(words) == 1:
+            return self.contains_word(phrase)
+        # Inner words must appear as whole tokens, outer ones as token substrings
+        if not all(w in self.tokens for w in words[1:-1]):
+            return False
+        if not (self.contains_word(words[0]) and self.contains_word(words[-1])):
+            return False
+        return phrase in self.text
+
+
+def _score_insight(output: str, task: str, index) -> dict:
     task_keywords = set(task.lower().split())
     output_words = set(output.lower().split())
-    chunk_text = " ".join(chunks).lower()
 
     relevance_score = len(task_keywords & output_words) / max(len(task_keywords), 1)
 
-    specificity_score = sum(1 for word in output_words if word in chunk_text) / max(len(output_words), 1)
+    specificity_score = sum(1 for word in output_words if index.contains_word(word)) / max(len(output_words), 1)
 
-    phrase_overlap = sum(1 for phrase in output.split('.') if phrase.strip().lower() in chunk_text)
-    faithfulness_score = phrase_overlap / max(len(output.split('.')), 1)
+    phrases = output.split('.')
+    phrase_overlap = sum(1 for phrase in phrases if index.contains_phrase(phrase.strip().lower()))
+    faithfulness_score = phrase_overlap / max(len(phrases), 1)
 
     return {
         "Relevance": round(relevance_score * 5, 1),
@@ -23,6 +98,101 @@ def evaluate_insight_quality(output: str, task: str, chunks: list[str]) -> dict:
         "Faithfulness": round(faithfulness_score * 5, 1)
     }
 
+
+def evaluate_insight_quality(output: str, task: str, chunks: list[str]) -> dict:
+    """
+    Automatically estimate insight quality with heuristics.
+    
+    - Relevance: Check if task keywords appear in output.
+    - Specificity: Look for named entities or URLs from chunks.
+    - Faithfulness: Check if output phrases overlap with chunks.
+    """
+    return _score_insight(output, task, _ChunkScan(chunks))
+
+
+def evaluate_insights_batch(table, chunks: list[str] = None, retriever=None,
+                            task_col: str = "Task", output_col: str = "Output",
+                            chunks_col: str = "Chunks"):
+    """
+    Score a whole result table at once.
+
+    Chunks come from `chunks_col` per row or from `chunks` for every row
+    (e.g. a domain's `retriever.chunks`). A chunk set shared by many rows is
+    indexed once and reused; other rows use the plain scan. Heuristic scores
+    match `evaluate_insight_quality` exactly.
+
+    With a `retriever`, a "Semantic Faithfulness" column is added: the best
+    cosine similarity between the output embedding and the stored (bundle)
+    embeddings of the row's chunks. It is NaN for rows none of whose chunks
+    are in the retriever's index.
+    """
+    import pandas as pd
+
+    if chunks is None and chunks_col not in table:
+        raise ValueError(f"Pass `chunks` or include a '{chunks_col}' column.")
+
+    outputs = [str(o) for o in table[output_col]]
+    tasks = [str(t) for t in table[task_col]]
+    # Distinct chunk sets, and which one each row is scored against
+    if chunks is not None:
+        # Materialize once: `retriever.chunks` decodes from the bundle on access
+        key = chunks if isinstance(chunks, str) else tuple(chunks)
+        _check_chunks("chunks", key)
+        chunk_sets, groups = [key], [0] * len(outputs)
+    else:
+        chunk_sets, groups, seen = [], [], {}
+        for label, c in zip(table.index, table[chunks_col]):
+            _check_chunks(f"Row {label!r}", c)
+            key = tuple(c)
+            group = seen.get(key)
+            if group is None:
+                group = seen[key] = len(chunk_sets)
+                chunk_sets.append(key)
+            groups.append(group)
+
+    uses = Counter(groups)
+    matchers = {}
+    rows = []
+    for output, task, group in zip(outputs, tasks, groups):
+        matcher = matchers.get(group)
+        if matcher is None:
+            matcher_cls = _ChunkIndex if uses[group] >= _INDEX_MIN_ROWS else _ChunkScan
+            matcher = matchers[group] = matcher_cls(list(chunk_sets[group]))
+        rows.append(_score_insight(output, task, matcher))
+
+    scores = pd.DataFrame(rows, index=table.index)
+    if retriever is not None:
+        scores["Semantic Faithfulness"] = _semantic_faithfulness(outputs, chunk_sets, groups, retriever)
+    return scores
+
+
+def _check_chunks(label: str, chunks):
+    if isinstance(chunks, str) or not all(isinstance(chunk, str) for chunk in chunks):
+        raise TypeError(f"{label}: chunks must be a list of strings, got {type(chunks).__name__}")
+
+
+def _semantic_faithfulness(outputs: list[str], chunk_sets: list[tuple], groups: list[int],
+                           retriever) -> np.ndarray:
+    stored = np.array(retriever.bundle.embeddings(), dtype=np.float32)
+    if len(stored) == 0:
+        return np.full(len(outputs), np.nan)
+    stored /= np.maximum(np.linalg.norm(stored, axis=1, keepdims=True), 1e-12)
+
+    encoded = np.asarray(retriever.embedding_model.encode(outputs), dtype=np.float32)
+    encoded /= np.maximum(np.linalg.norm(encoded, axis=1, keepdims=True), 1e-12)
+
+    # (rows x stored chunks) cosine matrix in one shot
+    similarity = encoded @ stored.T
+
+    positions = {chunk: i for i, chunk in enumerate(retriever.chunks)}
+    set_ids = [[positions[chunk] for chunk in c if chunk in positions] for c in chunk_sets]
+    best = np.full(len(outputs), np.nan, dtype=np.float32)
+    for row, group in enumerate(groups):
+        # Rows whose chunks are not in this index stay NaN
+        if set_ids[group]:
+            best[row] = similarity[row, set_ids[group]].max()
+    return np.round(np.clip(best, 0.0, 1.0) * 5, 1)
+
 def evaluate_retrieval_quality(chunks: list[str], task_prompt: str) -> dict:
     """
     Automatically score chunk-task alignment and content variety.
@@ -47,10 +217,40 @@ def log_scrape_result(site_type: str, passed: bool, used_fallback: bool, notes:
         "Notes": notes
     }
 
-def track_timing(scrape_sec: float, fallback_sec: float, llm_sec: float) -> dict:
-    return {
+def track_timing(scrape_sec: float, fallback_sec: float, llm_sec: float,
+                 retrieval_sec: float = 0.0, total_sec: float = None) -> dict:
+    """
+    Format per-stage durations. `scrape_sec` excludes the Selenium fallback,
+    which is reported separately. `total_sec` defaults to the stage sum.
+    """
+    timing = {
         "Domain scrape (Cloudscraper)": f"~{scrape_sec:.2f} sec",
         "Fallback w/ Selenium": f"~{fallback_sec:.2f} sec" if fallback_sec > 0 else "N/A",
-        "LLM Response (1-shot)": f"~{llm_sec:.2f} sec",
-        "Overall task turnaround": f"~{scrape_sec + fallback_sec + llm_sec:.2f} sec"
+    }
+    if retrieval_sec > 0:
+        timing["Retrieval (BM25 + FAISS)"] = f"~{retrieval_sec:.2f} sec"
+    timing["LLM Response (1-shot)"] = f"~{llm_sec:.2f} sec"
+    if total_sec is None:
+        total_sec = scrape_sec + fallback_sec + retrieval_sec + llm_sec
+    timing["Overall task turnaround"] = f"~{total_sec:.2f} sec"
+    return timing
+
+def summarize_counters(counters: dict) -> dict:
+    """
+    Turn raw metric counters (see src.metrics) into dashboard-friendly values.
+    """
+    scrapes = counters.get("scrape.requests", 0)
+    fallbacks = counters.get("scrape.fallbacks", 0)
+    hits = counters.get("retriever.cache_hits", 0)
+    misses = counters.get("retriever.cache_misses", 0)
+    query_hits = counters.get("retriever.query_cache_hits", 0) + counters.get("retriever.query_cache_semantic_hits", 0)
+    query_lookups = query_hits + counters.get("retriever.query_cache_misses", 0)
+    return {
+        "Scrapes": int(scrapes),
+        "Selenium fallback rate": f"{fallbacks / scrapes:.0%}" if scrapes else "N/A",
+        "Bytes fetched": f"{counters.get('scrape.bytes_fetched', 0) / 1024:.1f} KiB",
+        "Index cache hit rate": f"{hits / (hits + misses):.0%}" if hits + misses else "N/A",
+        "Query cache hit rate": f"{query_hits / query_lookups:.0%}" if query_lookups else "N/A",
+        "LLM calls": int(counters.get("llm.requests", 0)),
+        "LLM retries": int(counters.get("llm.retries", 0)),
     }
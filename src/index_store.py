@@ -0,0 +1,366 @@
+# index_store.py
+"""
+Single-file, memory-mappable per-domain retrieval bundle.
+
+Layout (all sections 64-byte aligned, little endian):
+
+    b"LGRB" | u32 version | u32 header length | JSON header | sections...
+
+The JSON header records every section's offset, dtype and shape, so opening
+a bundle only reads the header. Sections are mapped on first access with
+numpy views over a single read-only memmap, so nothing is copied or unpickled.
+
+Sections:
+    emb            float16 or int8 chunk embeddings (N x D)
+    emb_min/scale  per-dimension int8 dequantization parameters (D,)
+    text_offsets   u64 (N + 1) offsets into text_blob
+    text_blob      utf-8 chunk text
+    chunk_chars    u32 per-chunk character count
+    chunk_tokens   u32 per-chunk token count (BM25 document length)
+    term_offsets   u64 (V + 1) offsets into term_blob
+    term_blob      utf-8 vocabulary, sorted
+    term_idf       f64 BM25 idf per term
+    post_offsets   u64 (V + 1) offsets into post_docs / post_tf
+    post_docs      u32 chunk ids per term
+    post_tf        u32 term frequency per (term, chunk)
+"""
+
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"LGRB"
+VERSION = 1
+ALIGN = 64
+BUNDLE_EXT = ".lgrb"
+# Rows dequantized at a time during search
+SEARCH_BLOCK_ROWS = 4096
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _offsets_and_blob(strings) -> tuple:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def quantize(embeddings: np.ndarray, quantization: str) -> dict:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if quantization == "float16":
+        return {"emb": embeddings.astype(np.float16)}
+    if quantization == "int8":
+        vmin = embeddings.min(axis=0)
+        scale = (embeddings.max(axis=0) - vmin) / 255.0
+        scale[scale == 0] = 1.0
+        codes = np.round((embeddings - vmin) / scale) - 128
+        return {
+            "emb": np.clip(codes, -128, 127).astype(np.int8),
+            "emb_min": vmin.astype(np.float32),
+            "emb_scale": scale.astype(np.float32),
+        }
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+
+def dequantize(sections: dict, quantization: str) -> np.ndarray:
+    emb = sections["emb"]
+    if quantization == "float16":
+        return emb.astype(np.float32)
+    return (emb.astype(np.float32) + 128.0) * sections["emb_scale"] + sections["emb_min"]
+
+
+def _top_k_l2(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    # Squared L2 without the per-query constant, same ranking as IndexFlatL2
+    dists = (vectors ** 2).sum(axis=1)[None, :] - 2.0 * queries @ vectors.T
+    k = min(k, vectors.shape[0])
+    top = np.argpartition(dists, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(dists, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def measure_recall(embeddings: np.ndarray, quantization: str, k: int = 7,
+                   queries: np.ndarray = None, max_queries: int = 256, seed: int = 0) -> float:
+    """
+    Mean top-k overlap between exact float32 search and search over the
+    quantized vectors. Defaults to noisy copies of the chunk embeddings
+    as queries.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if len(embeddings) == 0:
+        return 1.0
+    if queries is None:
+        rng = np.random.default_rng(seed)
+        picks = rng.choice(len(embeddings), size=min(max_queries, len(embeddings)), replace=False)
+        noise = rng.normal(scale=embeddings.std() * 0.5, size=(len(picks), embeddings.shape[1]))
+        queries = embeddings[picks] + noise.astype(np.float32)
+    approx = dequantize(quantize(embeddings, quantization), quantization)
+    exact_top = _top_k_l2(embeddings, queries, k)
+    approx_top = _top_k_l2(approx, queries, k)
+    hits = [len(set(a) & set(b)) / len(a) for a, b in zip(exact_top, approx_top)]
+    return float(np.mean(hits))
+
+
+def write_bundle(path: str, domain: str, chunks: list[str], embeddings: np.ndarray, bm25,
+                 chunk_size: int, quantization: str = "float16", model_name: str = "",
+                 recall: float = None) -> dict:
+    """
+    Serialize chunks, quantized embeddings and the BM25 keyword index
+    (taken from a built `BM25Okapi`) into one bundle file.
+    """
+    sections = quantize(embeddings, quantization)
+
+    sections["text_offsets"], sections["text_blob"] = _offsets_and_blob(chunks)
+    sections["chunk_chars"] = np.array([len(c) for c in chunks], dtype=np.uint32)
+    sections["chunk_tokens"] = np.array(bm25.doc_len, dtype=np.uint32)
+
+    terms = sorted(bm25.idf)
+    sections["term_offsets"], sections["term_blob"] = _offsets_and_blob(terms)
+    sections["term_idf"] = np.array([bm25.idf[t] for t in terms], dtype=np.float64)
+
+    postings = {t: [] for t in terms}
+    for doc_id, freqs in enumerate(bm25.doc_freqs):
+        for term, tf in freqs.items():
+            postings[term].append((doc_id, tf))
+    post_offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+    np.cumsum([len(postings[t]) for t in terms], out=post_offsets[1:])
+    flat = [p for t in terms for p in postings[t]]
+    sections["post_offsets"] = post_offsets
+    sections["post_docs"] = np.array([d for d, _ in flat], dtype=np.uint32)
+    sections["post_tf"] = np.array([tf for _, tf in flat], dtype=np.uint32)
+
+    header = {
+        "version": VERSION,
+        "domain": domain,
+        "created": time.time(),
+        "model": model_name,
+        "count": len(chunks),
+        "dim": int(sections["emb"].shape[1]) if sections["emb"].ndim == 2 else 0,
+        "chunk_size": chunk_size,
+        "quantization": quantization,
+        "recall": recall,
+        "bm25": {"k1": bm25.k1, "b": bm25.b, "avgdl": bm25.avgdl},
+        "sections": {},
+    }
+
+    # Offsets depend on the header size, so lay out until it is stable
+    header_bytes = b""
+    while True:
+        offset = _align(12 + len(header_bytes))
+        for name, arr in sections.items():
+            header["sections"][name] = {
+                "offset": offset,
+                "dtype": arr.dtype.str,
+                "shape": list(arr.shape),
+            }
+            offset = _align(offset + arr.nbytes)
+        new_bytes = json.dumps(header).encode("utf-8")
+        if new_bytes == header_bytes:
+            break
+        header_bytes = new_bytes
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<II", VERSION, len(header_bytes)) + header_bytes)
+        for name, arr in sections.items():
+            f.write(b"\0" * (header["sections"][name]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(arr).tobytes())
+    # Readers may have the old file mapped, so never write in place
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        magic = f.read(4)
+        if magic != MAGIC:
+            raise ValueError(f"Not a retrieval bundle: {path}")
+        version, length = struct.unpack("<II", f.read(8))
+        if version > VERSION:
+            raise ValueError(f"Bundle version {version} is newer than supported ({VERSION}): {path}")
+        return json.loads(f.read(length))
+
+
+def list_bundles(cache_dir: str) -> list[dict]:
+    """
+    Headers of every bundle in `cache_dir`. Only header bytes are read.
+    """
+    headers = []
+    for name in sorted(os.listdir(cache_dir)):
+        if name.endswith(BUNDLE_EXT):
+            path = os.path.join(cache_dir, name)
+            try:
+                header = read_header(path)
+            except (OSError, ValueError):
+                continue
+            header["path"] = path
+            headers.append(header)
+    return headers
+
+
+class ChunkTexts:
+    """
+    Read-only sequence of chunk strings, decoded from the blob on access.
+    """
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class KeywordIndex:
+    """
+    BM25Okapi scoring over the bundle's inverted index. `get_scores`
+    returns the same values as `rank_bm25.BM25Okapi.get_scores`.
+    """
+    def __init__(self, bundle: "DomainBundle"):
+        params = bundle.header["bm25"]
+        self.k1 = params["k1"]
+        self.b = params["b"]
+        self.avgdl = params["avgdl"]
+        self._bundle = bundle
+        self._terms = None
+        self._norm = None
+
+    def _term_ids(self) -> dict:
+        if self._terms is None:
+            offsets = self._bundle.section("term_offsets")
+            blob = self._bundle.section("term_blob").tobytes()
+            self._terms = {
+                blob[offsets[i]:offsets[i + 1]].decode("utf-8"): i
+                for i in range(len(offsets) - 1)
+            }
+        return self._terms
+
+    def get_scores(self, query: list[str]) -> np.ndarray:
+        count = self._bundle.count
+        scores = np.zeros(count)
+        if count == 0:
+            return scores
+        if self._norm is None:
+            doc_len = self._bundle.section("chunk_tokens").astype(np.float64)
+            self._norm = self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
+        terms = self._term_ids()
+        idf = self._bundle.section("term_idf")
+        post_offsets = self._bundle.section("post_offsets")
+        post_docs = self._bundle.section("post_docs")
+        post_tf = self._bundle.section("post_tf")
+        for q in query:
+            t = terms.get(q)
+            if t is None:
+                continue
+            start, end = int(post_offsets[t]), int(post_offsets[t + 1])
+            docs = post_docs[start:end]
+            tf = post_tf[start:end].astype(np.float64)
+            scores[docs] += idf[t] * (tf * (self.k1 + 1) / (tf + self._norm[docs]))
+        return scores
+
+
+class DomainBundle:
+    """
+    Lazily mapped view of one bundle file. Opening reads only the header;
+    the file is memory-mapped the first time a section is needed.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.header = read_header(path)
+        self._mmap = None
+        self._sections = {}
+        self._sq_norms = None
+
+    @property
+    def count(self) -> int:
+        return self.header["count"]
+
+    @property
+    def quantization(self) -> str:
+        return self.header["quantization"]
+
+    def section(self, name: str) -> np.ndarray:
+        arr = self._sections.get(name)
+        if arr is None:
+            if self._mmap is None:
+                self._mmap = np.memmap(self.path, dtype=np.uint8, mode="r")
+            spec = self.header["sections"][name]
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            if count == 0:
+                return np.empty(spec["shape"], dtype=dtype)
+            arr = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=spec["offset"])
+            arr = arr.reshape(spec["shape"])
+            self._sections[name] = arr
+        return arr
+
+    @property
+    def chunks(self) -> ChunkTexts:
+        return ChunkTexts(self.section("text_offsets"), self.section("text_blob"))
+
+    @property
+    def keyword_index(self) -> KeywordIndex:
+        return KeywordIndex(self)
+
+    def _dequantized_blocks(self):
+        names = ["emb"] + (["emb_min", "emb_scale"] if self.quantization == "int8" else [])
+        sections = {n: self.section(n) for n in names}
+        for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+            block = dict(sections, emb=sections["emb"][start:start + SEARCH_BLOCK_ROWS])
+            yield start, dequantize(block, self.quantization)
+
+    def embeddings(self) -> np.ndarray:
+        """
+        float32 copy of all embeddings. Not cached; search does not need it.
+        """
+        names = ["emb"] + (["emb_min", "emb_scale"] if self.quantization == "int8" else [])
+        return dequantize({n: self.section(n) for n in names}, self.quantization)
+
+    def search(self, queries: np.ndarray, k: int) -> tuple:
+        """
+        Exact L2 search over the dequantized vectors, returning (distances,
+        ids) like `IndexFlatL2.search`. Codes are dequantized block by block
+        straight from the memmap, so only one block of float32 rows and the
+        per-row norms are ever held in memory.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, self.count)
+        if k <= 0:
+            return np.empty((len(queries), 0), dtype=np.float32), np.empty((len(queries), 0), dtype=np.int64)
+
+        sq_norms = self._sq_norms
+        compute_norms = sq_norms is None
+        if compute_norms:
+            sq_norms = np.empty(self.count, dtype=np.float32)
+        dots = np.empty((len(queries), self.count), dtype=np.float32)
+        for start, block in self._dequantized_blocks():
+            dots[:, start:start + len(block)] = queries @ block.T
+            if compute_norms:
+                sq_norms[start:start + len(block)] = (block ** 2).sum(axis=1)
+        if compute_norms:
+            # Publish only once complete; other threads may be searching too
+            self._sq_norms = sq_norms
+
+        dists = sq_norms[None, :] - 2.0 * dots + (queries ** 2).sum(axis=1)[:, None]
+        np.maximum(dists, 0.0, out=dists)
+        top = np.argpartition(dists, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(dists, top, axis=1).argsort(axis=1, kind="stable")
+        ids = np.take_along_axis(top, order, axis=1)
+        return np.take_along_axis(dists, ids, axis=1), ids.astype(np.int64)
@@ -2,6 +2,7 @@ import requests
 import config
 from dotenv import load_dotenv
 import os
+from src.metrics import span, inc
 # Load environment variables from .env file
 load_dotenv()
 
@@ -21,6 +22,15 @@ def query_llm(prompt: str) -> str:
         }
     }
 
+    with span("llm.query", model=config.HF_MODEL_NAME) as attrs:
+        result = _post(payload)
+        attrs["status"] = "error" if result.startswith("[Error") else "ok"
+    if result.startswith("[Error"):
+        inc("llm.errors")
+    return result
+
+def _post(payload: dict) -> str:
+    inc("llm.requests")
     try:
         response = requests.post(API_URL, headers=headers, json=payload)
         response.raise_for_status()  # Raises HTTPError for bad responses (4xx/5xx)
@@ -0,0 +1,279 @@
+# metrics.py
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+# Latency buckets (seconds) shared by every histogram
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_histograms = {}
+_local = threading.local()
+_http_server = None
+_http_server_failed = False
+_log_queue = queue.Queue()
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Trace:
+    """
+    Collects the spans and counter increments recorded on the current thread
+    while it is active. Used by the Evaluation page to read a single run.
+    """
+    def __init__(self):
+        self.spans = []
+        self.counters = defaultdict(float)
+
+    def total(self, name: str) -> float:
+        return sum(s["duration_sec"] for s in self.spans if s["name"] == name)
+
+    def durations(self) -> dict:
+        totals = defaultdict(float)
+        for s in self.spans:
+            totals[s["name"]] += s["duration_sec"]
+        return dict(totals)
+
+
+def _metric_name(name: str) -> str:
+    return name.replace(".", "_").replace("-", "_")
+
+
+def inc(name: str, value: float = 1.0):
+    with _lock:
+        _counters[name] += value
+    for trace in getattr(_local, "traces", []):
+        trace.counters[name] += value
+
+
+def observe(name: str, value: float):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.observe(value)
+
+
+def _log_writer_loop():
+    """
+    Drain queued span records into the JSON-lines log. The file stays open
+    and is only reopened when the configured path changes.
+    """
+    path, handle = None, None
+    while True:
+        item = _log_queue.get()
+        batch = [item]
+        while True:
+            try:
+                batch.append(_log_queue.get_nowait())
+            except queue.Empty:
+                break
+        flushed = []
+        for entry in batch:
+            if isinstance(entry, threading.Event):
+                flushed.append(entry)
+                continue
+            entry_path, record = entry
+            try:
+                line = json.dumps(record) + "\n"
+            except (TypeError, ValueError):
+                # Unserializable attribute: drop this record, keep the file
+                continue
+            try:
+                if entry_path != path:
+                    if handle:
+                        handle.close()
+                        path, handle = None, None
+                    directory = os.path.dirname(entry_path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    path, handle = entry_path, open(entry_path, "a", encoding="utf-8")
+                handle.write(line)
+            except OSError:
+                # Metrics must never break the pipeline; reopen on the next record
+                if handle:
+                    try:
+                        handle.close()
+                    except OSError:
+                        pass
+                path, handle = None, None
+        if handle:
+            try:
+                handle.flush()
+            except OSError:
+                pass
+        for event in flushed:
+            event.set()
+
+
+def _write_jsonl(record: dict):
+    global _log_writer
+    path = config.METRICS_LOG_PATH
+    if not path:
+        return
+    if _log_writer is None:
+        with _log_writer_lock:
+            if _log_writer is None:
+                _log_writer = threading.Thread(target=_log_writer_loop, daemon=True)
+                _log_writer.start()
+    # Serialization and file I/O happen off the caller's thread
+    _log_queue.put((os.path.abspath(path), record))
+
+
+def flush_log(timeout: float = 5.0):
+    """
+    Wait until every queued span record has been written.
+    """
+    if _log_writer is None:
+        return
+    done = threading.Event()
+    _log_queue.put(done)
+    done.wait(timeout)
+
+
+atexit.register(flush_log)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time a block of work. The duration goes into the `<name>` latency
+    histogram, is appended to the JSON-lines log and to any active trace.
+    Attributes can be added inside the block through the yielded dict.
+    """
+    attrs = dict(attrs)
+    start_wall = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        observe(name, duration)
+        record = {
+            "ts": start_wall,
+            "name": name,
+            "duration_sec": round(duration, 6),
+            "attrs": attrs,
+        }
+        if error:
+            record["error"] = error
+        for trace in getattr(_local, "traces", []):
+            trace.spans.append(record)
+        _write_jsonl(record)
+
+
+@contextmanager
+def trace():
+    """
+    Capture every span recorded on this thread inside the `with` block.
+    """
+    t = Trace()
+    traces = getattr(_local, "traces", None)
+    if traces is None:
+        traces = _local.traces = []
+    traces.append(t)
+    try:
+        yield t
+    finally:
+        traces.remove(t)
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "histograms": {
+                name: {"count": h.count, "sum": h.sum, "buckets": dict(zip(h.buckets, h.counts))}
+                for name, h in _histograms.items()
+            },
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def render_prometheus() -> str:
+    lines = []
+    with _lock:
+        for name, value in sorted(_counters.items()):
+            metric = f"leadgen_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, h in sorted(_histograms.items()):
+            metric = f"leadgen_{_metric_name(name)}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for bound, count in zip(h.buckets, h.counts):
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {h.count}')
+            lines.append(f"{metric}_sum {h.sum}")
+            lines.append(f"{metric}_count {h.count}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int = None, host: str = "127.0.0.1"):
+    """
+    Serve the Prometheus text format on /metrics from a daemon thread.
+    Safe to call repeatedly (e.g. on every Streamlit rerun); if the port
+    could not be bound, later calls return None without retrying.
+    """
+    global _http_server, _http_server_failed
+    port = config.METRICS_PORT if port is None else port
+    if _http_server is not None or _http_server_failed or not port:
+        return _http_server
+    try:
+        _http_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        # Port already taken, e.g. by another worker; don't retry on every rerun
+        _http_server_failed = True
+        print(f"⚠️ Metrics endpoint not started: {e}")
+        return None
+    threading.Thread(target=_http_server.serve_forever, daemon=True).start()
+    return _http_server
@@ -4,8 +4,13 @@ import time
 from src.scraper import scrape_site
 from src.llm import query_llm
 from src.vectorstore import HybridRetriever
+from src.metrics import span, inc
 
 def generate_insight(domain: str, task: str, top_k: int = 7, retries: int = 3, wait_sec: int = 3):
+    with span("insight", domain=domain):
+        return _generate_insight(domain, task, top_k, retries, wait_sec)
+
+def _generate_insight(domain: str, task: str, top_k: int, retries: int, wait_sec: int):
     print(f"\n🔍 Generating Insight for: {domain}")
     print("=" * 60)
 
@@ -51,9 +56,11 @@ Answer:
             and result.strip()
         ):
             break
+        inc("llm.retries")
         print(f"\n🔁 Retry {attempt}/{retries} after failure:\n{result[:100]}")
         time.sleep(wait_sec)
     else:
+        inc("llm.exhausted")
         result = "[Error] LLM failed after all retries."
 
     print("\n🧠 LLM Output:\n")
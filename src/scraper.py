@@ -7,6 +7,7 @@ from selenium.webdriver.chrome.options import Options
 import time
 import re
 from difflib import SequenceMatcher
+from src.metrics import span, inc
 
 BOILERPLATE_PATTERNS = [
     r'accept cookies?',
@@ -58,7 +59,9 @@ def update_cache(text):
 def scrape_cta_text(domain):
     try:
         scraper = cloudscraper.create_scraper()
-        response = scraper.get(domain, timeout=10)
+        with span("scrape.cta_fetch", domain=domain):
+            response = scraper.get(domain, timeout=10)
+        inc("scrape.bytes_fetched", len(response.content))
         soup = BeautifulSoup(response.text, "html.parser")
 
         cta_elements = soup.find_all(["a", "button"])
@@ -113,9 +116,19 @@ def extract_contacts(text):
 
 
 def scrape_site(domain: str, max_chars: int = 10000) -> str:
+    with span("scrape", domain=domain) as attrs:
+        result = _scrape_site(domain, max_chars, attrs)
+        attrs["status"] = "error" if result.startswith("[Error") else "ok"
+        return result
+
+
+def _scrape_site(domain: str, max_chars: int, attrs: dict) -> str:
+    inc("scrape.requests")
     try:
         scraper = cloudscraper.create_scraper()
-        response = scraper.get(domain, timeout=10)
+        with span("scrape.fetch", domain=domain):
+            response = scraper.get(domain, timeout=10)
+        inc("scrape.bytes_fetched", len(response.content))
         soup = BeautifulSoup(response.text, "html.parser")
 
         title = soup.title.string.strip() if soup.title and soup.title.string else ""
@@ -127,22 +140,27 @@ def scrape_site(domain: str, max_chars: int = 10000) -> str:
         body_text = soup.get_text(separator=" ", strip=True)[:max_chars] if soup else ""
 
         # Fallback if too short
+        attrs["fallback"] = len(body_text) < 200
         if len(body_text) < 200:
+            inc("scrape.fallbacks")
             try:
-                chrome_options = Options()
-                chrome_options.add_argument("--headless")
-                chrome_options.add_argument("--no-sandbox")
-                chrome_options.add_argument("--disable-dev-shm-usage")
-
-                driver = webdriver.Chrome(options=chrome_options)
-                driver.get(domain)
-                time.sleep(5)
-                html = driver.execute_script("return document.documentElement.innerHTML;")
-                driver.quit()
+                with span("scrape.selenium_fallback", domain=domain):
+                    chrome_options = Options()
+                    chrome_options.add_argument("--headless")
+                    chrome_options.add_argument("--no-sandbox")
+                    chrome_options.add_argument("--disable-dev-shm-usage")
+
+                    driver = webdriver.Chrome(options=chrome_options)
+                    driver.get(domain)
+                    time.sleep(5)
+                    html = driver.execute_script("return document.documentElement.innerHTML;")
+                    driver.quit()
+                inc("scrape.bytes_fetched", len(html.encode("utf-8")))
 
                 soup = BeautifulSoup(html, "html.parser")
                 body_text = soup.get_text(separator=" ", strip=True)[:max_chars]
             except Exception as se:
+                inc("scrape.fallback_errors")
                 return f"[Error - Selenium Fallback] {str(se)}"
 
         cleaned_text, junk_text = remove_boilerplate(body_text)
@@ -170,6 +188,7 @@ def scrape_site(domain: str, max_chars: int = 10000) -> str:
             combined += f"\n\n[JUNK]\n{junk_text}"
 
         if is_redundant(combined):
+            inc("scrape.skipped_duplicates")
             return "[Skipped] Duplicate content previously scraped."
 
         update_cache(combined)
@@ -180,4 +199,5 @@ def scrape_site(domain: str, max_chars: int = 10000) -> str:
         return combined if combined else "[Error] Could not extract content."
 
     except Exception as e:
+        inc("scrape.errors")
         return f"[Error] {str(e)}"
\ No newline at end of file
@@ -3,47 +3,253 @@ import pickle
 import faiss
 import numpy as np
 from rank_bm25 import BM25Okapi
-from sentence_transformers import SentenceTransformer
 import re
+import threading
+import time
+from collections import OrderedDict
+import config
+from src.metrics import span, inc, observe
+from src.index_store import BUNDLE_EXT, DomainBundle, measure_recall, read_header, write_bundle
+from src.embedding_service import EmbeddingClient
 
-# Load embedding model once
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+_model_lock = threading.Lock()
+_local_model = None
+_clients = {}
+
+def load_local_model():
+    """
+    Load the embedding model in this process (once).
+    """
+    global _local_model
+    with _model_lock:
+        if _local_model is None:
+            from sentence_transformers import SentenceTransformer
+            _local_model = SentenceTransformer(config.EMBEDDING_MODEL_NAME)
+    return _local_model
+
+def get_embedding_model(socket_path: str = None):
+    """
+    Object with an `encode(texts)` method: a client of the shared embedding
+    server when a socket is configured, otherwise the in-process model.
+    """
+    socket_path = socket_path or config.EMBEDDING_SOCKET
+    if not socket_path:
+        return load_local_model()
+    client = _clients.get(socket_path)
+    if client is None:
+        client = _clients[socket_path] = EmbeddingClient(socket_path, fallback=load_local_model)
+    return client
+
+def embedding_dim(model) -> int:
+    """
+    Vector size of an embedding model (or client), probing it if it
+    cannot report the size itself.
+    """
+    get_dim = getattr(model, "get_sentence_embedding_dimension", None)
+    if get_dim is not None:
+        return int(get_dim())
+    return int(np.asarray(model.encode([""])).shape[1])
 
 CACHE_DIR = "cache"
+# Model behind the old FAISS + pickle caches, which did not record it
+LEGACY_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+def _cache_base(domain):
+    return domain.replace("https://", "").replace("http://", "").replace("/", "_")
+
+def get_bundle_path(domain):
+    return os.path.join(CACHE_DIR, f"{_cache_base(domain)}{BUNDLE_EXT}")
+
 def get_cache_paths(domain):
-    base = domain.replace("https://", "").replace("http://", "").replace("/", "_")
+    """
+    Legacy per-domain files (FAISS index + two pickles), only read for migration.
+    """
+    base = _cache_base(domain)
     faiss_path = os.path.join(CACHE_DIR, f"{base}_faiss.index")
     bm25_path = os.path.join(CACHE_DIR, f"{base}_bm25.pkl")
     chunks_path = os.path.join(CACHE_DIR, f"{base}_chunks.pkl")
     return faiss_path, bm25_path, chunks_path
 
+class QueryCache:
+    """
+    LRU cache of search results keyed on
+    (domain, index version, query, top_k, mix_ratio).
+
+    The query is used verbatim: BM25 tokenization is case- and
+    punctuation-sensitive, so only the identical string is guaranteed to
+    return what a fresh search would.
+
+    With a `semantic_threshold`, a miss on the exact key can still be served
+    by a cached query of the same domain/version/top_k/mix_ratio whose
+    embedding has cosine similarity >= threshold with the new query.
+    """
+    def __init__(self, max_entries: int = 1024, semantic_threshold: float = None):
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+        self._entries = OrderedDict()  # key -> (results, unit embedding or None)
+        self._versions = {}  # domain -> index version currently cached
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return list(entry[0])
+
+    def get_similar(self, key, embedding):
+        if self.semantic_threshold is None:
+            return None
+        query = _unit(embedding)
+        scope = (key[0], key[1], key[3], key[4])
+        with self._lock:
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if e[1] is not None and (k[0], k[1], k[3], k[4]) == scope
+            ]
+            if not candidates:
+                return None
+            similarity = np.stack([e[1] for _, e in candidates]) @ query
+            best = int(similarity.argmax())
+            if similarity[best] < self.semantic_threshold:
+                return None
+            best_key, entry = candidates[best]
+            self._entries.move_to_end(best_key)
+            self.semantic_hits += 1
+        return list(entry[0])
+
+    def put(self, key, results, embedding=None, miss: bool = True):
+        """
+        Store `results` under `key`. `miss=False` adds an alias for results
+        already served (e.g. by a semantic hit) without counting a miss.
+        """
+        unit = _unit(embedding) if embedding is not None else None
+        with self._lock:
+            if miss:
+                self.misses += 1
+            self._entries[key] = (tuple(results), unit)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, domain: str, keep_version=None):
+        """
+        Drop cached results for `domain` built on any other index version.
+        """
+        with self._lock:
+            if keep_version is not None and self._versions.get(domain) == keep_version:
+                return
+            self._versions[domain] = keep_version
+            for key in [k for k in self._entries if k[0] == domain and k[1] != keep_version]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.hits = self.semantic_hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+# Shared by every retriever in this process
+query_cache = QueryCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_SEMANTIC_THRESHOLD)
+
 class HybridRetriever:
-    def __init__(self, text: str, domain: str, chunk_size: int = 3):
+    def __init__(self, text: str, domain: str, chunk_size: int = 3, embedding_socket: str = None):
         self.domain = domain
         self.chunk_size = chunk_size
+        # Client mode when a socket is given (or set in config)
+        self.embedding_model = get_embedding_model(embedding_socket)
 
+        bundle_path = get_bundle_path(domain)
         faiss_path, bm25_path, chunks_path = get_cache_paths(domain)
 
-        if os.path.exists(faiss_path) and os.path.exists(bm25_path) and os.path.exists(chunks_path):
-            self.faiss_index = faiss.read_index(faiss_path)
-            with open(bm25_path, "rb") as f:
-                self.bm25 = pickle.load(f)
-            with open(chunks_path, "rb") as f:
-                self.chunks = pickle.load(f)
+        if os.path.exists(bundle_path) and self._bundle_matches_model(bundle_path):
+            inc("retriever.cache_hits")
+            with span("retriever.load", domain=domain):
+                self.load_bundle(bundle_path)
+        elif (
+            not os.path.exists(bundle_path)
+            and config.EMBEDDING_MODEL_NAME == LEGACY_EMBEDDING_MODEL
+            and os.path.exists(faiss_path) and os.path.exists(bm25_path) and os.path.exists(chunks_path)
+        ):
+            # One-time conversion of the old FAISS + pickle cache
+            inc("retriever.cache_migrations")
+            with span("retriever.migrate", domain=domain):
+                legacy_index = faiss.read_index(faiss_path)
+                with open(bm25_path, "rb") as f:
+                    bm25 = pickle.load(f)
+                with open(chunks_path, "rb") as f:
+                    chunks = pickle.load(f)
+                embeddings = legacy_index.reconstruct_n(0, legacy_index.ntotal)
+                self.save_bundle(bundle_path, chunks, embeddings, bm25)
+                self.load_bundle(bundle_path)
         else:
-            self.chunks = self.chunk_text(text)
-            # Build BM25 from all chunks
-            self.bm25 = BM25Okapi([chunk.split() for chunk in self.chunks])
-            # Build FAISS index from chunk embeddings
-            self.faiss_index, _ = self.build_faiss(self.chunks)
-
-            faiss.write_index(self.faiss_index, faiss_path)
-            with open(bm25_path, "wb") as f:
-                pickle.dump(self.bm25, f)
-            with open(chunks_path, "wb") as f:
-                pickle.dump(self.chunks, f)
+            inc("retriever.cache_misses")
+            with span("retriever.build", domain=domain) as attrs:
+                chunks = self.chunk_text(text)
+                attrs["chunks"] = len(chunks)
+                # Build BM25 from all chunks
+                bm25 = BM25Okapi([chunk.split() for chunk in chunks])
+                # Embed chunks; search runs on the quantized copy from the bundle
+                embeddings = self.embed_chunks(chunks)
+                header = self.save_bundle(bundle_path, chunks, embeddings, bm25)
+                attrs["quantization"] = header["quantization"]
+                self.load_bundle(bundle_path)
+
+    def _bundle_matches_model(self, path: str) -> bool:
+        """
+        A bundle embedded with another model (or vector size) can't be
+        searched with this model's query embeddings; it is rebuilt instead.
+        """
+        header = read_header(path)
+        if header.get("model") != config.EMBEDDING_MODEL_NAME:
+            return False
+        return header["count"] == 0 or header["dim"] == embedding_dim(self.embedding_model)
+
+    def save_bundle(self, path: str, chunks, embeddings, bm25) -> dict:
+        quantization = config.INDEX_QUANTIZATION
+        recall = measure_recall(embeddings, quantization)
+        if recall < config.INDEX_MIN_RECALL and quantization != "float16":
+            # Quantization changed top-k too much for this domain
+            inc("retriever.quantization_fallbacks")
+            quantization = "float16"
+            recall = measure_recall(embeddings, quantization)
+        return write_bundle(
+            path, self.domain, chunks, embeddings, bm25,
+            chunk_size=self.chunk_size, quantization=quantization,
+            model_name=config.EMBEDDING_MODEL_NAME, recall=recall,
+        )
+
+    def load_bundle(self, path: str):
+        self.bundle = DomainBundle(path)
+        self.chunks = self.bundle.chunks
+        self.bm25 = self.bundle.keyword_index
+        # A rebuilt bundle gets a new version, which drops stale cached results
+        self.index_version = self.bundle.header["created"]
+        query_cache.invalidate(self.domain, keep_version=self.index_version)
 
     def chunk_text(self, text: str):
         # Try sentence-based splitting
@@ -65,24 +271,49 @@ class HybridRetriever:
         # Filter out empty or whitespace-only chunks
         return [chunk.strip() for chunk in chunks if chunk.strip()]
 
-    def build_faiss(self, chunks):
-        embeddings = embedding_model.encode(chunks)
-        dim = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dim)
-        index.add(np.array(embeddings))
-        return index, embeddings
+    def embed_chunks(self, chunks):
+        with span("embed.chunks", count=len(chunks)):
+            embeddings = self.embedding_model.encode(chunks)
+        inc("embed.texts", len(chunks))
+        return embeddings
 
     def search(self, query: str, top_k: int = 5, mix_ratio: float = 0.5):
         """
         Hybrid search: merges FAISS (semantic) scores and BM25 (keyword) scores.
         By default, we only do top_k on the FAISS side for efficiency,
         but consider *all* BM25 chunk scores. 
+        Results are served from `query_cache` when the same (or, with the
+        semantic tier, a near-identical) query was already answered.
         """
-        # Encode the query
-        query_embedding = embedding_model.encode([query])[0]
+        with span("retriever.search", top_k=top_k) as attrs:
+            start = time.perf_counter()
+            key = (self.domain, self.index_version, query, top_k, mix_ratio)
+            results = query_cache.get(key)
+            outcome = "hits"
+            if results is None:
+                # Encode the query
+                with span("embed.query"):
+                    query_embedding = self.embedding_model.encode([query])[0]
+                inc("embed.texts")
+
+                results = query_cache.get_similar(key, query_embedding)
+                outcome = "semantic_hits"
+                if results is not None:
+                    # Repeats of this wording become exact hits
+                    query_cache.put(key, results, query_embedding, miss=False)
+                else:
+                    results = self._search(query, query_embedding, top_k, mix_ratio)
+                    query_cache.put(key, results, query_embedding)
+                    outcome = "misses"
+
+            attrs["cache"] = outcome
+            inc(f"retriever.query_cache_{outcome}")
+            observe(f"retriever.search.cache_{outcome}", time.perf_counter() - start)
+            return results
 
-        # --- 1) Get FAISS top_k ---
-        D, I = self.faiss_index.search(np.array([query_embedding]), top_k)
+    def _search(self, query: str, query_embedding, top_k: int, mix_ratio: float):
+        # --- 1) Get vector top_k (exact L2 over the bundle codes) ---
+        D, I = self.bundle.search(np.array([query_embedding]), top_k)
         # Convert distances into "faiss scores"
         # We'll do 1 / (1 + distance) so that lower distance => higher score
         faiss_scores = {i: 1.0 / (1.0 + D[0][j]) for j, i in enumerate(I[0])}
@@ -0,0 +1,55 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Make `config` and `src.*` importable when pytest runs from any directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Manual scripts that hit live sites; run them directly, not under pytest
+collect_ignore = ["test_rag.py", "test_scrape.py"]
+
+
+
+class FakeEncoder:
+    """
+    Deterministic stand-in for SentenceTransformer: one seeded random
+    vector per text, so tests never need the real model.
+    """
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.stack([
+            np.random.default_rng(int(hashlib.md5(t.encode("utf-8")).hexdigest()[:8], 16))
+            .normal(size=self.dim).astype(np.float32)
+            for t in texts
+        ])
+
+
+@pytest.fixture
+def fake_encoder():
+    return FakeEncoder()
+
+
+@pytest.fixture
+def retriever_env(tmp_path, monkeypatch, fake_encoder):
+    """
+    Point the retriever at a temp cache dir and the fake encoder, with
+    span logging off and an empty query cache.
+    """
+    import config
+    from src import vectorstore
+
+    monkeypatch.setattr(config, "METRICS_LOG_PATH", None)
+    monkeypatch.setattr(vectorstore, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(vectorstore, "get_embedding_model", lambda socket_path=None: fake_encoder)
+    vectorstore.query_cache.clear()
+    yield vectorstore
+    vectorstore.query_cache.clear()
@@ -0,0 +1,109 @@
+# test_embedding_service.py
+
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import config
+from src.embedding_service import EmbeddingClient, EmbeddingServer
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch, fake_encoder):
+    monkeypatch.setattr(config, "METRICS_LOG_PATH", None)
+    socket_path = str(tmp_path / "embed.sock")
+    srv = EmbeddingServer(socket_path, fake_encoder.encode, max_batch=64, max_wait_ms=20)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_client_matches_model_and_is_writable(server, fake_encoder):
+    client = EmbeddingClient(server.server_address)
+
+    vectors = client.encode(["alpha", "beta"])
+
+    np.testing.assert_array_equal(vectors, fake_encoder.encode(["alpha", "beta"]))
+    assert vectors.flags.writeable
+    vectors /= 2.0  # in-place math, as evaluation does
+
+
+def test_empty_request_has_model_dimension(server, fake_encoder):
+    assert EmbeddingClient(server.server_address).encode([]).shape == (0, fake_encoder.dim)
+
+
+def test_concurrent_requests_are_batched(server, fake_encoder):
+    client = EmbeddingClient(server.server_address)
+    results = {}
+    batches = []
+    encode = server.batcher.encode_fn
+    server.batcher.encode_fn = lambda texts: batches.append(len(texts)) or encode(texts)
+
+    def worker(i):
+        results[i] = client.encode([f"query {i}"])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # 16 single-text requests must not need 16 model calls
+    assert sum(batches) == 16
+    assert len(batches) < 16
+    for i in range(16):
+        np.testing.assert_array_equal(results[i], fake_encoder.encode([f"query {i}"]))
+
+
+def test_fallback_opens_circuit_and_warns_once(tmp_path, fake_encoder, capsys, monkeypatch):
+    monkeypatch.setattr(config, "METRICS_LOG_PATH", None)
+    client = EmbeddingClient(str(tmp_path / "missing.sock"), fallback=lambda: fake_encoder, retry_after=60)
+    requests = []
+    original = client._request
+    client._request = lambda texts: requests.append(texts) or original(texts)
+
+    for _ in range(5):
+        np.testing.assert_array_equal(client.encode(["q"]), fake_encoder.encode(["q"]))
+
+    # Only the first call tried the server, once; the rest went straight to the fallback
+    assert len(requests) == 1
+    assert capsys.readouterr().out.count("Embedding server unavailable") == 1
+
+
+def test_without_fallback_raises(tmp_path):
+    with pytest.raises(ConnectionError):
+        EmbeddingClient(str(tmp_path / "missing.sock")).encode(["q"])
+
+
+def test_slow_server_is_not_resent(tmp_path, fake_encoder, monkeypatch):
+    monkeypatch.setattr(config, "METRICS_LOG_PATH", None)
+    calls = []
+
+    def slow_encode(texts):
+        calls.append(texts)
+        time.sleep(0.5)
+        return fake_encoder.encode(texts)
+
+    srv = EmbeddingServer(str(tmp_path / "slow.sock"), slow_encode, max_wait_ms=0)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        client = EmbeddingClient(srv.server_address, fallback=lambda: fake_encoder, timeout=0.1)
+        for _ in range(3):
+            np.testing.assert_array_equal(client.encode(["q"]), fake_encoder.encode(["q"]))
+        assert calls == [["q"]]
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_stale_connection_reconnects_once(server, fake_encoder):
+    client = EmbeddingClient(server.server_address)
+    stale, peer = socket.socketpair()
+    peer.close()
+    client._local.sock = stale
+
+    np.testing.assert_array_equal(client.encode(["q"]), fake_encoder.encode(["q"]))
@@ -0,0 +1,159 @@
+# test_evaluation.py
+
+import random
+
+import pandas as pd
+import pytest
+
+from src import evaluation
+from src.evaluation import evaluate_insight_quality, evaluate_insights_batch
+
+
+def original_insight_quality(output: str, task: str, chunks: list[str]) -> dict:
+    # Substring implementation the heuristics must stay compatible with
+    task_keywords = set(task.lower().split())
+    output_words = set(output.lower().split())
+    chunk_text = " ".join(chunks).lower()
+
+    relevance_score = len(task_keywords & output_words) / max(len(task_keywords), 1)
+    specificity_score = sum(1 for word in output_words if word in chunk_text) / max(len(output_words), 1)
+    phrase_overlap = sum(1 for phrase in output.split('.') if phrase.strip().lower() in chunk_text)
+    faithfulness_score = phrase_overlap / max(len(output.split('.')), 1)
+
+    return {
+        "Relevance": round(relevance_score * 5, 1),
+        "Specificity": round(specificity_score * 5, 1),
+        "Faithfulness": round(faithfulness_score * 5, 1)
+    }
+
+
+EDGE_CASES = [
+    # Empty phrases: "" is a substring of everything
+    ("Hello.", "hello", ["hello world"]),
+    ("...", "x", ["abc"]),
+    ("", "", []),
+    ("Word.", "word", []),
+    # Short words matched inside longer tokens
+    ("a b it is.", "is it", ["this item"]),
+    ("z q.", "z", ["xyz abq"]),
+    # Multi-space phrases, across chunk boundaries and whitespace runs
+    ("alpha  beta. gamma delta.", "alpha", ["xalpha  beta", "gamma", "delta"]),
+    ("gamma delta. beta gamma.", "gamma", ["alpha beta", "gamma delta"]),
+    ("one two three. two three.", "two", ["one\ntwo three", "zero one two three four"]),
+    ("Sign In. ACCEPT cookies.", "cookies", ["Accept Cookies and sign in"]),
+]
+
+
+@pytest.mark.parametrize("output, task, chunks", EDGE_CASES)
+def test_matches_original_on_edge_cases(output, task, chunks):
+    expected = original_insight_quality(output, task, chunks)
+    assert evaluate_insight_quality(output, task, chunks) == expected
+    index = evaluation._ChunkIndex(chunks)
+    assert evaluation._score_insight(output, task, index) == expected
+
+
+def test_matches_original_on_random_text():
+    rng = random.Random(0)
+    alphabet = "abcde .\nXY"
+
+    def text(n):
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, n)))
+
+    for _ in range(5000):
+        chunks = [text(40) for _ in range(rng.randint(0, 4))]
+        output = text(30)
+        if chunks and rng.random() < 0.5:
+            output += ". " + chunks[0][3:15]
+        task = text(15)
+        expected = original_insight_quality(output, task, chunks)
+        assert evaluation._score_insight(output, task, evaluation._ChunkIndex(chunks)) == expected
+        assert evaluate_insight_quality(output, task, chunks) == expected
+
+
+def test_batch_matches_per_row_scores():
+    rng = random.Random(1)
+    vocab = ["services", "mission", "cloud", "data", "team", "a", "is", "cl"]
+    shared = [" ".join(rng.choice(vocab) for _ in range(12)) + "." for _ in range(5)]
+    rows = []
+    for i in range(20):
+        own = [" ".join(rng.choice(vocab) for _ in range(8)) for _ in range(3)]
+        rows.append({
+            "Task": "what services",
+            "Output": " ".join(rng.choice(vocab) for _ in range(6)) + ". cloud data.",
+            # Half the rows share one chunk set, enough to take the indexed path
+            "Chunks": shared if i % 2 else own,
+        })
+    table = pd.DataFrame(rows)
+
+    scores = evaluate_insights_batch(table)
+
+    for label, row in table.iterrows():
+        expected = original_insight_quality(row["Output"], row["Task"], row["Chunks"])
+        assert scores.loc[label].to_dict() == expected
+
+
+def test_batch_with_shared_chunks():
+    table = pd.DataFrame({"Task": ["mission"] * 10, "Output": ["Our mission is data."] * 10})
+    chunks = ["Our mission is data.", "We sell cloud."]
+
+    scores = evaluate_insights_batch(table, chunks=chunks)
+
+    expected = original_insight_quality("Our mission is data.", "mission", chunks)
+    assert all(scores.loc[i].to_dict() == expected for i in table.index)
+
+
+def test_batch_rejects_string_chunk_cells():
+    table = pd.DataFrame({"Task": ["t"], "Output": ["o"], "Chunks": ["a single string"]})
+    with pytest.raises(TypeError):
+        evaluate_insights_batch(table)
+    with pytest.raises(TypeError):
+        evaluate_insights_batch(table[["Task", "Output"]], chunks="a single string")
+
+
+class CountingChunks(list):
+    iterations = 0
+
+    def __iter__(self):
+        CountingChunks.iterations += 1
+        return super().__iter__()
+
+
+def test_batch_reads_shared_chunks_once():
+    chunks = CountingChunks(["Our mission is data.", "We sell cloud."])
+    table = pd.DataFrame({"Task": ["mission"] * 50, "Output": ["Our mission is data."] * 50})
+
+    scores = evaluate_insights_batch(table, chunks=chunks)
+
+    assert CountingChunks.iterations == 1
+    expected = original_insight_quality("Our mission is data.", "mission", list(chunks))
+    assert all(scores.loc[i].to_dict() == expected for i in table.index)
+
+
+def test_batch_with_retriever_chunks(retriever_env):
+    text = ". ".join(f"Acme sells cloud data service number {i}" for i in range(30)) + "."
+    retriever = retriever_env.HybridRetriever(text=text, domain="https://acme.example/")
+    outputs = ["Acme sells cloud data.", "Something unrelated.", "service number 3"] * 4
+    table = pd.DataFrame({"Task": ["what does acme sell"] * len(outputs), "Output": outputs})
+
+    scores = evaluate_insights_batch(table, chunks=retriever.chunks, retriever=retriever)
+
+    plain = list(retriever.chunks)
+    for label, row in table.iterrows():
+        expected = original_insight_quality(row["Output"], row["Task"], plain)
+        assert {k: scores.loc[label, k] for k in expected} == expected
+    assert scores["Semantic Faithfulness"].between(0, 5).all()
+
+
+def test_semantic_faithfulness_nan_for_unknown_chunks(retriever_env):
+    text = ". ".join(f"Acme sells cloud data service number {i}" for i in range(30)) + "."
+    retriever = retriever_env.HybridRetriever(text=text, domain="https://acme.example/")
+    table = pd.DataFrame({
+        "Task": ["t", "t"],
+        "Output": ["Acme sells cloud data.", "Acme sells cloud data."],
+        "Chunks": [[retriever.chunks[0]], ["not in index"]],
+    })
+
+    semantic = evaluate_insights_batch(table, retriever=retriever)["Semantic Faithfulness"]
+
+    assert 0 <= semantic.iloc[0] <= 5
+    assert pd.isna(semantic.iloc[1])
@@ -0,0 +1,182 @@
+# test_index_store.py
+
+import os
+import pickle
+import random
+
+import faiss
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+import config
+from src.index_store import (
+    BUNDLE_EXT,
+    DomainBundle,
+    dequantize,
+    list_bundles,
+    measure_recall,
+    quantize,
+    write_bundle,
+)
+
+
+def make_chunks(n=120, seed=3):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(300)] + ["café", "日本", "naïve", "Ünïcode"]
+    return [" ".join(rng.choice(vocab) for _ in range(rng.randint(4, 30))) for _ in range(n)]
+
+
+def make_embeddings(n=120, dim=64, seed=5):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+@pytest.fixture
+def chunks():
+    return make_chunks()
+
+
+@pytest.fixture
+def bm25(chunks):
+    return BM25Okapi([c.split() for c in chunks])
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_round_trip(tmp_path, chunks, bm25, quantization):
+    chunks = chunks + ["Überraschung — 東京 🚀 ü"]
+    bm25 = BM25Okapi([c.split() for c in chunks])
+    embeddings = make_embeddings(len(chunks))
+    path = str(tmp_path / f"example.com{BUNDLE_EXT}")
+
+    header = write_bundle(path, "https://example.com", chunks, embeddings, bm25,
+                          chunk_size=3, quantization=quantization, model_name="m", recall=0.99)
+    bundle = DomainBundle(path)
+
+    assert bundle.header == header
+    assert bundle.count == len(chunks)
+    assert list(bundle.chunks) == chunks
+    assert bundle.chunks[-1] == chunks[-1]
+    assert bundle.chunks[1:3] == chunks[1:3]
+    assert list(bundle.section("chunk_chars")) == [len(c) for c in chunks]
+    assert list(bundle.section("chunk_tokens")) == bm25.doc_len
+    expected = dequantize(quantize(embeddings, quantization), quantization)
+    np.testing.assert_array_equal(bundle.embeddings(), expected)
+    [listed] = list_bundles(str(tmp_path))
+    assert listed["domain"] == "https://example.com"
+    assert listed["quantization"] == quantization
+
+
+def test_keyword_scores_match_bm25okapi(tmp_path, chunks, bm25):
+    path = str(tmp_path / f"x{BUNDLE_EXT}")
+    write_bundle(path, "x", chunks, make_embeddings(len(chunks)), bm25, chunk_size=3)
+    index = DomainBundle(path).keyword_index
+
+    queries = [
+        ["w1", "w2"],
+        ["w1", "w1", "w7"],           # repeated term
+        ["unknown", "w3"],            # unknown term
+        ["nothing", "matches"],
+        ["café", "日本", "naïve"],
+        [],
+    ]
+    for query in queries:
+        np.testing.assert_allclose(index.get_scores(query), bm25.get_scores(query), rtol=1e-12)
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_recall_within_tolerance(quantization):
+    embeddings = make_embeddings(n=500, dim=384, seed=11)
+    assert measure_recall(embeddings, quantization, k=7, seed=0) >= config.INDEX_MIN_RECALL
+
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_search_matches_flat_l2(tmp_path, chunks, bm25, quantization, monkeypatch):
+    from src import index_store
+
+    # Small blocks so the blockwise path is exercised
+    monkeypatch.setattr(index_store, "SEARCH_BLOCK_ROWS", 17)
+    embeddings = make_embeddings(len(chunks))
+    path = str(tmp_path / f"x{BUNDLE_EXT}")
+    write_bundle(path, "x", chunks, embeddings, bm25, chunk_size=3, quantization=quantization)
+    bundle = DomainBundle(path)
+
+    flat = faiss.IndexFlatL2(embeddings.shape[1])
+    flat.add(bundle.embeddings())
+    queries = make_embeddings(n=5, seed=99)
+    D, I = bundle.search(queries, 7)
+    D_ref, I_ref = flat.search(queries, 7)
+
+    np.testing.assert_array_equal(I, I_ref)
+    np.testing.assert_allclose(D, D_ref, rtol=1e-4, atol=1e-3)
+    assert bundle.search(queries, 10_000)[1].shape == (5, len(chunks))
+
+
+def test_legacy_cache_is_migrated(retriever_env, fake_encoder):
+    vectorstore = retriever_env
+    chunks = ["alpha beta.", "gamma delta.", "beta gamma.", "epsilon café."]
+    faiss_path, bm25_path, chunks_path = vectorstore.get_cache_paths("https://old.example/")
+    legacy = faiss.IndexFlatL2(fake_encoder.dim)
+    legacy.add(fake_encoder.encode(chunks))
+    faiss.write_index(legacy, faiss_path)
+    legacy_bm25 = BM25Okapi([c.split() for c in chunks])
+    with open(bm25_path, "wb") as f:
+        pickle.dump(legacy_bm25, f)
+    with open(chunks_path, "wb") as f:
+        pickle.dump(chunks, f)
+
+    retriever = vectorstore.HybridRetriever(text="ignored", domain="https://old.example/")
+
+    assert os.path.exists(vectorstore.get_bundle_path("https://old.example/"))
+    assert list(retriever.chunks) == chunks
+    np.testing.assert_allclose(retriever.bm25.get_scores(["beta"]), legacy_bm25.get_scores(["beta"]))
+    assert retriever.search("beta gamma.", top_k=1) == ["beta gamma."]
+
+    # The next load reads the bundle, not the pickles
+    os.remove(bm25_path)
+    reloaded = vectorstore.HybridRetriever(text="ignored", domain="https://old.example/")
+    assert list(reloaded.chunks) == chunks
+
+
+def test_norms_published_only_when_complete(tmp_path, chunks, bm25, monkeypatch):
+    from src import index_store
+
+    monkeypatch.setattr(index_store, "SEARCH_BLOCK_ROWS", 17)
+    path = str(tmp_path / f"x{BUNDLE_EXT}")
+    write_bundle(path, "x", chunks, make_embeddings(len(chunks)), bm25, chunk_size=3)
+    bundle = DomainBundle(path)
+    blocks = DomainBundle._dequantized_blocks
+
+    def watched_blocks(self):
+        for start, block in blocks(self):
+            # A concurrent search here must not see half-filled norms
+            assert self._sq_norms is None
+            yield start, block
+
+    monkeypatch.setattr(DomainBundle, "_dequantized_blocks", watched_blocks)
+    queries = make_embeddings(n=3, seed=99)
+    bundle.search(queries, 7)
+    monkeypatch.setattr(DomainBundle, "_dequantized_blocks", blocks)
+
+    expected = (bundle.embeddings() ** 2).sum(axis=1)
+    np.testing.assert_allclose(bundle._sq_norms, expected, rtol=1e-5)
+
+
+def test_bundle_rebuilt_when_model_changes(retriever_env, monkeypatch):
+    from conftest import FakeEncoder
+
+    vectorstore = retriever_env
+    text = ". ".join(f"Acme sentence {i} about cloud data" for i in range(20)) + "."
+    domain = "https://acme.example/"
+    first = vectorstore.HybridRetriever(text=text, domain=domain)
+    assert vectorstore.HybridRetriever(text=text, domain=domain).index_version == first.index_version
+
+    monkeypatch.setattr(config, "EMBEDDING_MODEL_NAME", "another-model")
+    renamed = vectorstore.HybridRetriever(text=text, domain=domain)
+    assert renamed.index_version != first.index_version
+    assert renamed.bundle.header["model"] == "another-model"
+
+    # Same name but a different vector size (e.g. a server running another model)
+    monkeypatch.setattr(vectorstore, "get_embedding_model", lambda socket_path=None: FakeEncoder(dim=16))
+    resized = vectorstore.HybridRetriever(text=text, domain=domain)
+    assert resized.bundle.header["dim"] == 16
+    assert len(resized.search("cloud data", top_k=3)) == 3
@@ -0,0 +1,104 @@
+# test_metrics.py
+
+import json
+import socket
+import threading
+
+import pytest
+
+import config
+from src import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_LOG_PATH", None)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def parse_prometheus(text: str) -> dict:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_render_prometheus_counters_and_histograms():
+    metrics.inc("scrape.requests")
+    metrics.inc("scrape.requests", 2)
+    for value in (0.003, 0.02, 100.0):
+        metrics.observe("llm.generate", value)
+
+    text = metrics.render_prometheus()
+    samples = parse_prometheus(text)
+
+    assert "# TYPE leadgen_scrape_requests_total counter" in text
+    assert samples["leadgen_scrape_requests_total"] == 3
+    assert "# TYPE leadgen_llm_generate_seconds histogram" in text
+    # Buckets are cumulative; +Inf holds everything and equals the count
+    assert samples['leadgen_llm_generate_seconds_bucket{le="0.005"}'] == 1
+    assert samples['leadgen_llm_generate_seconds_bucket{le="0.025"}'] == 2
+    assert samples['leadgen_llm_generate_seconds_bucket{le="30.0"}'] == 2
+    assert samples['leadgen_llm_generate_seconds_bucket{le="+Inf"}'] == 3
+    assert samples["leadgen_llm_generate_seconds_count"] == 3
+    assert samples["leadgen_llm_generate_seconds_sum"] == pytest.approx(100.023)
+
+
+def test_trace_is_per_thread():
+    def other_thread():
+        with metrics.span("retriever.search"):
+            pass
+        metrics.inc("embed.texts", 5)
+
+    with metrics.trace() as run:
+        with metrics.span("retriever.search"):
+            pass
+        with metrics.span("llm.generate"):
+            pass
+        metrics.inc("embed.texts")
+        worker = threading.Thread(target=other_thread)
+        worker.start()
+        worker.join()
+
+    assert len(run.spans) == 2
+    assert run.total("retriever.search") == run.spans[0]["duration_sec"]
+    assert set(run.durations()) == {"retriever.search", "llm.generate"}
+    assert dict(run.counters) == {"embed.texts": 1}
+    # The global registry still sees both threads
+    assert metrics.snapshot()["counters"]["embed.texts"] == 6
+
+
+def test_span_records_written_after_flush(tmp_path, monkeypatch):
+    path = tmp_path / "logs" / "metrics.jsonl"
+    monkeypatch.setattr(config, "METRICS_LOG_PATH", str(path))
+
+    with metrics.span("scrape.fetch", url="https://acme.example/") as attrs:
+        attrs["bytes"] = 10
+    # An unserializable attribute drops that record only
+    with metrics.span("scrape.fetch", bad=object()):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.span("llm.generate"):
+            raise ValueError("boom")
+    metrics.flush_log()
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["name"] for r in records] == ["scrape.fetch", "llm.generate"]
+    assert records[0]["attrs"] == {"url": "https://acme.example/", "bytes": 10}
+    assert records[1]["error"] == "ValueError"
+
+
+def test_http_server_port_taken_warns_once(monkeypatch, capsys):
+    monkeypatch.setattr(metrics, "_http_server", None)
+    monkeypatch.setattr(metrics, "_http_server_failed", False)
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        assert metrics.start_http_server(port) is None
+        assert metrics.start_http_server(port) is None
+    assert capsys.readouterr().out.count("Metrics endpoint not started") == 1
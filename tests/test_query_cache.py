@@ -0,0 +1,128 @@
+# test_query_cache.py
+
+import os
+
+import numpy as np
+
+from src.vectorstore import QueryCache
+
+TEXT = ". ".join(
+    f"Acme Corp sentence {i} covers services pricing and contact details number {i}"
+    for i in range(40)
+) + "."
+
+
+def key(query, domain="https://acme.example/", version=1.0, top_k=7, mix_ratio=0.5):
+    return (domain, version, query, top_k, mix_ratio)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.put(key("a"), ["A"])
+    cache.put(key("b"), ["B"])
+    assert cache.get(key("a")) == ["A"]  # "b" is now the oldest
+    cache.put(key("c"), ["C"])
+
+    assert cache.get(key("b")) is None
+    assert cache.get(key("a")) == ["A"]
+    assert cache.get(key("c")) == ["C"]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+def test_semantic_threshold():
+    base = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    near = np.array([0.99, 0.1, 0.0], dtype=np.float32)  # cosine ~0.995
+    far = np.array([0.6, 0.8, 0.0], dtype=np.float32)  # cosine 0.6
+
+    cache = QueryCache(semantic_threshold=0.95)
+    cache.put(key("what services do they offer"), ["S"], base)
+    assert cache.get_similar(key("their services?"), near) == ["S"]
+    assert cache.get_similar(key("pricing"), far) is None
+    # Different top_k or domain is never served from another scope
+    assert cache.get_similar(key("their services?", top_k=3), near) is None
+    assert cache.get_similar(key("their services?", domain="https://other.example/"), near) is None
+
+    cache.semantic_threshold = None
+    assert cache.get_similar(key("their services?"), near) is None
+
+
+def test_stats_hit_ratio():
+    cache = QueryCache(semantic_threshold=0.9)
+    vector = np.ones(4, dtype=np.float32)
+    cache.put(key("a"), ["A"], vector)
+    cache.put(key("b"), ["B"])
+    cache.get(key("a"))
+    cache.get(key("a"))
+    cache.get_similar(key("a again"), vector)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["semantic_hits"], stats["misses"]) == (2, 1, 2)
+    assert stats["hit_ratio"] == 3 / 5
+
+    cache.clear()
+    assert cache.stats()["hit_ratio"] == 0.0
+
+
+def test_invalidate_keeps_only_current_version():
+    cache = QueryCache()
+    cache.put(key("a", version=1.0), ["old"])
+    cache.put(key("a", domain="https://other.example/"), ["other"])
+    cache.invalidate("https://acme.example/", keep_version=2.0)
+
+    assert cache.get(key("a", version=1.0)) is None
+    assert cache.get(key("a", domain="https://other.example/")) == ["other"]
+
+
+def test_search_hits_cache(retriever_env, fake_encoder):
+    retriever = retriever_env.HybridRetriever(text=TEXT, domain="https://acme.example/")
+    first = retriever.search("acme services pricing", top_k=5)
+    calls = fake_encoder.calls
+
+    assert retriever.search("acme services pricing", top_k=5) == first
+    assert fake_encoder.calls == calls  # exact hit skips the query embedding
+    assert retriever_env.query_cache.stats()["hits"] == 1
+
+
+def test_query_variants_match_fresh_search(retriever_env, monkeypatch):
+    # Keyword scoring is case-sensitive, so variants must not share an exact key
+    monkeypatch.setattr(retriever_env.query_cache, "semantic_threshold", None)
+    retriever = retriever_env.HybridRetriever(text=TEXT, domain="https://acme.example/")
+    retriever.search("acme services pricing", top_k=5)
+
+    for variant in ("Acme services pricing", "acme  services pricing?"):
+        cached = retriever.search(variant, top_k=5)
+        fresh = retriever._search(variant, retriever.embedding_model.encode([variant])[0], 5, 0.5)
+        assert cached == fresh
+
+
+def test_rebuild_invalidates_domain(retriever_env):
+    domain = "https://acme.example/"
+    retriever = retriever_env.HybridRetriever(text=TEXT, domain=domain)
+    retriever.search("acme services pricing", top_k=5)
+    assert retriever_env.query_cache.stats()["entries"] == 1
+
+    # Same process, new index version: results of the old bundle are dropped
+    os.remove(retriever_env.get_bundle_path(domain))
+    rebuilt = retriever_env.HybridRetriever(text=TEXT.replace("Acme", "Globex"), domain=domain)
+    assert rebuilt.index_version != retriever.index_version
+    assert retriever_env.query_cache.stats()["entries"] == 0
+
+    results = rebuilt.search("acme services pricing", top_k=5)
+    assert all("Globex" in chunk for chunk in results)
+
+
+def test_semantic_hit_is_stored_under_new_wording(retriever_env, fake_encoder, monkeypatch):
+    # Any two queries count as near-duplicates
+    monkeypatch.setattr(retriever_env.query_cache, "semantic_threshold", -1.0)
+    retriever = retriever_env.HybridRetriever(text=TEXT, domain="https://acme.example/")
+    first = retriever.search("what services do they offer", top_k=5)
+
+    assert retriever.search("their services?", top_k=5) == first
+    calls = fake_encoder.calls
+    assert retriever.search("their services?", top_k=5) == first
+    assert fake_encoder.calls == calls  # exact hit, no re-encode or scan
+
+    stats = retriever_env.query_cache.stats()
+    assert (stats["hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["entries"] == 2